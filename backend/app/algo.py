@@ -1,163 +1,300 @@
-from typing import Deque, Dict, List, Optional, Tuple
-from collections import deque
+from typing import List, Tuple
+
+import numpy as np
+from numba import njit, prange
 
 # Local types (avoid importing from main to prevent circular imports)
 Tile = str
 Grid = List[List[Tile]]
 
-Position = Tuple[int, int]
-
-
-def _is_drivable(cell: Tile) -> bool:
-	return cell != "0"
-
-
-def _find_key_points(grid: Grid) -> Tuple[Position, List[Position], Dict[str, List[Position]]]:
-	start: Optional[Position] = None
-	flags: List[Position] = []
-	teleports: Dict[str, List[Position]] = {}
-	for r in range(len(grid)):
-		for c in range(len(grid[0])):
-			cell = str(grid[r][c])
-			if cell == "S":
-				start = (r, c)
-			elif cell == "F":
-				flags.append((r, c))
-			elif cell.startswith("T"):
-				teleports.setdefault(cell, []).append((r, c))
-	if start is None:
+# int8 tile codes; every teleport pad is TELEPORT, its pairing lives in partner_flat
+WALL = 0
+ROAD = 1
+START = 2
+FLAG = 3
+TELEPORT = -1
+
+INF = 10 ** 9
+
+# Move codes 0..3 emitted by the BFS: (dr, dc) and the matching API move.
+# Opposite moves differ only in the lowest bit, so mv ^ 1 reverses a move.
+_DIRS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+_MOVE_LABELS = ('up', 'down', 'left', 'right')
+
+
+def _grid_to_array(grid: Grid) -> Tuple[np.ndarray, np.ndarray]:
+	# Encode the grid once so the search reads a single byte per cell.
+	# partner_flat[r * cols + c] is the flat index of the paired teleport, or -1.
+	# dtype=object compares the exact strings; a str dtype drops trailing NULs,
+	# which would turn e.g. "S\x00" into a start. The prefix test is unaffected.
+	raw = np.array(grid, dtype=object)
+	if raw.ndim != 2:
+		raise ValueError("Grid must be a non-empty rectangle")
+	arr = np.full(raw.shape, ROAD, dtype=np.int8)
+	arr[raw == "0"] = WALL
+	arr[raw == "S"] = START
+	arr[raw == "F"] = FLAG
+
+	partner_flat = np.full(raw.size, -1, dtype=np.int32)
+	teleport_idx = np.flatnonzero(np.char.startswith(raw.astype(str), "T"))
+	if teleport_idx.size:
+		labels, label_ids, counts = np.unique(raw.ravel()[teleport_idx], return_inverse=True, return_counts=True)
+		for label, count in zip(labels.tolist(), counts.tolist()):
+			if count != 2:
+				raise ValueError(f"Teleport {label} must appear exactly twice")
+		arr.ravel()[teleport_idx] = TELEPORT
+		pairs = teleport_idx[np.argsort(label_ids, kind="stable")].reshape(-1, 2)
+		partner_flat[pairs[:, 0]] = pairs[:, 1]
+		partner_flat[pairs[:, 1]] = pairs[:, 0]
+	return arr, partner_flat
+
+
+def _find_key_points(arr: np.ndarray) -> np.ndarray:
+	# Flat indices of the start followed by the flags in row-major order
+	starts = np.flatnonzero(arr == START)
+	if len(starts) == 0:
 		raise ValueError("Grid missing start 'S'")
-	return start, flags, teleports
-
-
-def _teleport_partner_map(teleports: Dict[str, List[Position]]) -> Dict[Position, Position]:
-	partner: Dict[Position, Position] = {}
-	for label, points in teleports.items():
-		if len(points) != 2:
-			raise ValueError(f"Teleport {label} must appear exactly twice")
-		a, b = points
-		partner[a] = b
-		partner[b] = a
-	return partner
-
-
-def _in_bounds(r: int, c: int, grid: Grid) -> bool:
-	return 0 <= r < len(grid) and 0 <= c < len(grid[0])
-
-
-
-def _zero_one_bfs(grid: Grid, src: Position, partner: Dict[Position, Position]) -> Tuple[Dict[Position, int], Dict[Position, Tuple[Position, str]]]:
-	# Uniform-cost BFS where stepping into a teleport immediately yields its partner.
-	# Resulting path labels only include U/D/L/R, never 'T'.
-	dist: Dict[Position, int] = {}
-	parent: Dict[Position, Tuple[Position, str]] = {}
-	q: Deque[Position] = deque()
-	INF = 10 ** 9
-
-	# Initialize distances
-	for r in range(len(grid)):
-		for c in range(len(grid[0])):
-			if _is_drivable(str(grid[r][c])):
-				dist[(r, c)] = INF
-
-	dist[src] = 0
-	q.append(src)
-
-	# Directions
-	dirs = [(-1, 0, 'U'), (1, 0, 'D'), (0, -1, 'L'), (0, 1, 'R')]
-
-	while q:
-		u = q.popleft()
-		u_r, u_c = u
+	flags = np.flatnonzero(arr == FLAG)
+	return np.concatenate((starts[:1], flags)).astype(np.int32)
+
+
+def _neighbor_table(arr: np.ndarray) -> np.ndarray:
+	# neigh[idx, mv] is the flat index reached by move code mv, or -1 for walls
+	# and off-grid moves, so the BFS needs one load per direction.
+	rows, cols = arr.shape
+	tiles = arr.ravel()
+	r, c = np.divmod(np.arange(arr.size), cols)
+	neigh = np.full((arr.size, 4), -1, np.int32)
+	for mv, (dr, dc) in enumerate(_DIRS):
+		vr = r + dr
+		vc = c + dc
+		inside = np.flatnonzero((vr >= 0) & (vr < rows) & (vc >= 0) & (vc < cols))
+		v = vr[inside] * cols + vc[inside]
+		drivable = tiles[v] != WALL
+		neigh[inside[drivable], mv] = v[drivable]
+	return neigh
+
+
+@njit(cache=True)
+def _zero_one_bfs(tiles: np.ndarray, neigh: np.ndarray, partner_flat: np.ndarray, key_id: np.ndarray, num_keys: int, src_id: int, src: int, dist_out: np.ndarray, parent_out: np.ndarray, parent_mv_out: np.ndarray) -> None:
+	# Uniform-cost BFS over flat indices where stepping into a teleport immediately
+	# yields its partner. Move codes index _MOVE_LABELS, never a teleport.
+	# One fill per source; walls are never relaxed, so they need no special handling
+	dist_out.fill(INF)
+	parent_out.fill(-1)
+	dist_out[src] = 0
+
+	# Distances are final on discovery, so stop once every higher-indexed key
+	# point is found (lower-indexed ones already searched towards this source)
+	remaining = num_keys - 1 - src_id
+	if remaining == 0:
+		return
+
+	# Every cell is enqueued at most once, so a flat array is enough
+	q = np.empty(tiles.shape[0], np.int32)
+	head = 0
+	tail = 0
+	q[tail] = src
+	tail += 1
+
+	while head < tail:
+		u = q[head]
+		head += 1
 
 		# 1-cost adjacent moves
-		for dr, dc, mv in dirs:
-			vr, vc = u_r + dr, u_c + dc
-			if not _in_bounds(vr, vc, grid):
-				continue
-			cell_v = str(grid[vr][vc])
-			if not _is_drivable(cell_v):
+		for mv in range(4):
+			v = neigh[u, mv]
+			if v < 0:
 				continue
 			# If stepping into a teleport, land on its partner immediately
-			if cell_v.startswith('T') and (vr, vc) in partner:
-				v = partner[(vr, vc)]
-			else:
-				v = (vr, vc)
-			if dist[u] + 1 < dist[v]:
-				dist[v] = dist[u] + 1
-				parent[v] = (u, mv)
-				q.append(v)
-
-	return dist, parent
-
-
-def _reconstruct_moves(parent: Dict[Position, Tuple[Position, str]], src: Position, dst: Position) -> List[str]:
-	moves_rev: List[str] = []
+			if tiles[v] < 0:
+				v = partner_flat[v]
+			if dist_out[u] + 1 < dist_out[v]:
+				dist_out[v] = dist_out[u] + 1
+				parent_out[v] = u
+				parent_mv_out[v] = mv
+				q[tail] = v
+				tail += 1
+				if key_id[v] > src_id:
+					remaining -= 1
+					if remaining == 0:
+						return
+
+
+def _reconstruct_moves(parent: np.ndarray, parent_mv: np.ndarray, src: int, dst: int) -> List[int]:
+	moves_rev: List[int] = []
 	cur = dst
 	while cur != src:
-		if cur not in parent:
+		prev = parent[cur]
+		if prev < 0:
 			return []
-		prev, mv = parent[cur]
-		moves_rev.append(mv)
+		moves_rev.append(int(parent_mv[cur]))
 		cur = prev
 	moves_rev.reverse()
 	return moves_rev
 
 
-def _pairwise_shortest_paths(grid: Grid, points: List[Position], partner: Dict[Position, Position]) -> Tuple[List[List[int]], Dict[Tuple[int, int], List[str]]]:
-	n = len(points)
-	dist_matrix: List[List[int]] = [[10 ** 9] * n for _ in range(n)]
-	move_paths: Dict[Tuple[int, int], List[str]] = {}
-	for i, src in enumerate(points):
-		dist, parent = _zero_one_bfs(grid, src, partner)
-		for j, dst in enumerate(points):
-			if i == j:
-				dist_matrix[i][j] = 0
-				move_paths[(i, j)] = []
-				continue
-			if dst in dist and dist[dst] < 10 ** 9:
-				moves = _reconstruct_moves(parent, src, dst)
-				dist_matrix[i][j] = dist[dst]
-				move_paths[(i, j)] = moves
-			else:
-				dist_matrix[i][j] = 10 ** 9
-				move_paths[(i, j)] = []
-	return dist_matrix, move_paths
+def _leg_moves(parent: np.ndarray, parent_mv: np.ndarray, points: np.ndarray, a: int, b: int) -> List[int]:
+	if a < b:
+		return _reconstruct_moves(parent[a], parent_mv[a], int(points[a]), int(points[b]))
+	# Only the lower-indexed point was searched, so replay its path backwards.
+	# Reversed, a teleport hop lands on the entry pad instead of the exit pad,
+	# which is exactly where the next reversed move has to leave from.
+	forward = _reconstruct_moves(parent[b], parent_mv[b], int(points[b]), int(points[a]))
+	return [mv ^ 1 for mv in reversed(forward)]
 
 
-def _held_karp_tsp(dist: List[List[int]]) -> Tuple[int, List[int]]:
-	# Start at index 0 (the 'S'), visit all others, do not return.
-	n = len(dist)
+@njit(parallel=True, cache=True)
+def _all_bfs(tiles: np.ndarray, neigh: np.ndarray, partner_flat: np.ndarray, key_id: np.ndarray, srcs: np.ndarray, dist_mat: np.ndarray, parent_mat: np.ndarray, parent_mv_mat: np.ndarray) -> None:
+	# Sources are independent and each one owns its row, so no synchronization is needed.
+	# The last key point has no higher-indexed target and gets no row.
+	for i in prange(srcs.shape[0] - 1):
+		_zero_one_bfs(tiles, neigh, partner_flat, key_id, srcs.shape[0], i, srcs[i], dist_mat[i], parent_mat[i], parent_mv_mat[i])
+
+
+def _pairwise_shortest_paths(arr: np.ndarray, points: np.ndarray, partner_flat: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+	# Returns the key-point distance matrix plus each source's parent and move-code
+	# rows; paths are only reconstructed for the legs the tour actually uses.
+	n = len(points)
+	# Each BFS resets its own rows, so the work arrays can start uninitialized
+	dist = np.empty((n - 1, arr.size), np.int32)
+	parent = np.empty((n - 1, arr.size), np.int32)
+	parent_mv = np.empty((n - 1, arr.size), np.int8)
+	key_id = np.full(arr.size, -1, np.int32)
+	key_id[points] = np.arange(n, dtype=np.int32)
+	_all_bfs(arr.ravel(), _neighbor_table(arr), partner_flat, key_id, points, dist, parent, parent_mv)
+
+	# Grid moves and teleports are both reversible, so distances are symmetric:
+	# fill the upper triangle from the searches and mirror it
+	rows, cols = np.triu_indices(n, 1)
+	dist_matrix = np.zeros((n, n), np.int32)
+	dist_matrix[rows, cols] = dist[rows, points[cols]]
+	dist_matrix[cols, rows] = dist_matrix[rows, cols]
+	return dist_matrix, parent, parent_mv
+
+
+@njit(cache=True)
+def _nearest_neighbor_cost(dist: np.ndarray) -> int:
+	# Cost of the greedy tour from the start; an upper bound on the optimal tour.
+	n = dist.shape[0]
+	visited = np.zeros(n, np.bool_)
+	visited[0] = True
+	cur = 0
+	total = 0
+	for _ in range(n - 1):
+		best = -1
+		for k in range(n):
+			if visited[k] or dist[cur, k] >= INF:
+				continue
+			if best < 0 or dist[cur, k] < dist[cur, best]:
+				best = k
+		if best < 0:
+			return INF
+		visited[best] = True
+		total += dist[cur, best]
+		cur = best
+	return total
+
+
+@njit(cache=True)
+def _unvisited_lower_bounds(dist: np.ndarray) -> np.ndarray:
+	# lb[mask] = sum over stops outside mask of their cheapest incoming edge.
+	# Every unvisited stop is still entered exactly once, so this never overestimates.
+	n = dist.shape[0]
+	in_min = np.full(n, INF, np.int64)
+	for k in range(n):
+		for i in range(n):
+			if i != k and dist[i, k] < in_min[k]:
+				in_min[k] = dist[i, k]
+	lb = np.empty(1 << n, np.int64)
+	lb[0] = in_min.sum()
+	for k in range(n):
+		for m in range(1 << k):
+			lb[m | (1 << k)] = lb[m] - in_min[k]
+	return lb
+
+
+@njit(cache=True)
+def _start_masks_by_popcount(n: int) -> Tuple[np.ndarray, np.ndarray]:
+	# Masks containing the start (bit 0), counting-sorted by popcount.
+	# Layer pc is masks[starts[pc]:starts[pc + 1]].
+	ALL = 1 << n
+	popcount = np.zeros(ALL, np.int8)
+	for mask in range(1, ALL):
+		popcount[mask] = popcount[mask >> 1] + (mask & 1)
+	starts = np.zeros(n + 2, np.int64)
+	for mask in range(1, ALL, 2):
+		starts[popcount[mask] + 1] += 1
+	for pc in range(1, n + 2):
+		starts[pc] += starts[pc - 1]
+	masks = np.empty(ALL >> 1, np.int64)
+	fill = starts.copy()
+	for mask in range(1, ALL, 2):
+		pc = popcount[mask]
+		masks[fill[pc]] = mask
+		fill[pc] += 1
+	return masks, starts
+
+
+@njit(cache=True)
+def _held_karp_dp(dist: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+	# dp[mask, j] = cheapest cost to visit mask ending at j; prev[mask, j] = previous stop.
+	# Scanning j in increasing order with a strict < keeps the smaller prev on ties.
+	n = dist.shape[0]
 	ALL = 1 << n
-	INF = 10 ** 9
-	# dp[mask][j] = (cost, prev)
-	dp: List[Dict[int, Tuple[int, int]]] = [
-		{ } for _ in range(ALL)
-	]
-	start_mask = 1 << 0
-	dp[start_mask][0] = (0, -1)
-
-	for mask in range(ALL):
-		if not (mask & start_mask):
-			continue
-		for j, (cost_j, _) in list(dp[mask].items()):
-			for k in range(n):
-				if mask & (1 << k):
+	full_mask = ALL - 1
+	dp = np.full((ALL, n), INF, np.int32)
+	prev = np.full((ALL, n), -1, np.int8)
+	dp[1, 0] = 0
+
+	# Branch and bound: drop states that cannot beat the best known tour. Pruning
+	# only on a strict > keeps every state that could tie the optimum.
+	upper = _nearest_neighbor_cost(dist)
+	lb = _unvisited_lower_bounds(dist)
+
+	# Only masks containing the start (bit 0) are reachable. Expanding them one
+	# popcount layer at a time finishes every state before it is read, and an
+	# empty layer means everything past it was pruned too.
+	masks, starts = _start_masks_by_popcount(n)
+	for pc in range(1, n):
+		alive = False
+		for idx in range(starts[pc], starts[pc + 1]):
+			mask = masks[idx]
+			for j in range(n):
+				if not (mask >> j) & 1:
 					continue
-				new_mask = mask | (1 << k)
-				cand = cost_j + dist[j][k]
-				existing = dp[new_mask].get(k)
-				if existing is None or cand < existing[0] or (cand == existing[0] and j < existing[1]):
-					dp[new_mask][k] = (cand, j)
+				cost_j = dp[mask, j]
+				if cost_j >= INF or cost_j + lb[mask] > upper:
+					continue
+				alive = True
+				for k in range(n):
+					if (mask >> k) & 1 or dist[j, k] >= INF:
+						continue
+					new_mask = mask | (1 << k)
+					cand = cost_j + dist[j, k]
+					if cand + lb[new_mask] > upper:
+						continue
+					if cand < dp[new_mask, k]:
+						dp[new_mask, k] = cand
+						prev[new_mask, k] = j
+						if new_mask == full_mask and cand < upper:
+							upper = cand
+		if not alive:
+			break
+	return dp, prev
+
+
+def _held_karp_tsp(dist: np.ndarray) -> Tuple[int, List[int]]:
+	# Start at index 0 (the 'S'), visit all others, do not return.
+	n = dist.shape[0]
+	dp, prev = _held_karp_dp(dist)
 
 	full_mask = (1 << n) - 1
 	best_cost = INF
 	end_idx = n  # prefer smaller index on tie
-	for j, (cost_j, _) in dp[full_mask].items():
-		if j == 0:
-			continue
-		if cost_j < best_cost or (cost_j == best_cost and j < end_idx):
-			best_cost = cost_j
+	for j in range(1, n):
+		if dp[full_mask, j] < best_cost:
+			best_cost = int(dp[full_mask, j])
 			end_idx = j
 
 	if end_idx == n:
@@ -169,7 +306,7 @@ def _held_karp_tsp(dist: List[List[int]]) -> Tuple[int, List[int]]:
 	j = end_idx
 	while j != -1:
 		order.append(j)
-		cost_j, prev_j = dp[mask][j]
+		prev_j = int(prev[mask, j])
 		mask ^= (1 << j)
 		j = prev_j
 	order.reverse()
@@ -177,32 +314,18 @@ def _held_karp_tsp(dist: List[List[int]]) -> Tuple[int, List[int]]:
 
 
 def solve_grid_to_moves(grid: Grid) -> List[str]:
-	start, flags, teleports = _find_key_points(grid)
-	partner = _teleport_partner_map(teleports)
-	points: List[Position] = [start] + flags
+	arr, partner_flat = _grid_to_array(grid)
+	points = _find_key_points(arr)
 	# Precompute pairwise shortest paths with teleport as 0-cost edges
-	dist, move_paths = _pairwise_shortest_paths(grid, points, partner)
+	dist, parent, parent_mv = _pairwise_shortest_paths(arr, points, partner_flat)
 	# Ensure all flags are reachable from start at least
 	for i in range(1, len(points)):
-		if dist[0][i] >= 10 ** 9:
+		if dist[0, i] >= INF:
 			raise ValueError("Some flags are unreachable from start")
 	# Solve TSP (path variant, no return)
 	_, order = _held_karp_tsp(dist)
-	# Concatenate moves, skipping teleport labels
-	moves: List[str] = []
-	for a, b in zip(order, order[1:]):
-		segment = move_paths[(a, b)]
-		for mv in segment:
-			if mv == 'T':
-				continue
-			if mv == 'U':
-				moves.append('up')
-			elif mv == 'D':
-				moves.append('down')
-			elif mv == 'L':
-				moves.append('left')
-			elif mv == 'R':
-				moves.append('right')
-	return moves
+	# Concatenate the legs; move codes index straight into the API move names
+	segments = [_leg_moves(parent, parent_mv, points, a, b) for a, b in zip(order, order[1:])]
+	return [_MOVE_LABELS[mv] for segment in segments for mv in segment]
 
 
@@ -1,9 +1,19 @@
-from typing import List, Dict, Tuple
+from typing import AsyncIterator, List, Dict, Tuple
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 from fastapi.middleware.cors import CORSMiddleware
+import hashlib
+import itertools
 import os
-import json
+import orjson
+
+# The solver's parallel BFS may first run off the main thread (lifespan hook,
+# test client); Numba's TBB layer then hangs at interpreter exit, so prefer the
+# other layers. Numba reads this when the solver is first imported.
+os.environ.setdefault("NUMBA_THREADING_LAYER_PRIORITY", "omp workqueue tbb")
 
 Tile = str
 Grid = List[List[Tile]]
@@ -26,7 +36,14 @@ class SolveRequest(BaseModel):
 class SolveResponse(BaseModel):
 	moves: List[str]
 
-app = FastAPI(title="Car Game Backend")
+@asynccontextmanager
+async def _lifespan(app: FastAPI) -> AsyncIterator[None]:
+	# Solve the curated tracks when the server starts, not on every import
+	_precompute_tracks(_validated)
+	yield
+
+
+app = FastAPI(title="Car Game Backend", default_response_class=ORJSONResponse, lifespan=_lifespan)
 
 # Configure CORS (update allowed origins during development)
 app.add_middleware(
@@ -45,36 +62,34 @@ def _validate_grid(grid: Grid) -> Tuple[bool, str]:
 	if not grid or not grid[0]:
 		return False, "Grid must be non-empty"
 
-	rows = len(grid)
 	cols = len(grid[0])
 	for row in grid:
 		if len(row) != cols:
 			return False, "All rows must have equal length"
 
-	# Allowed tokens
-	allowed_prefixes = {"0", "1", "S", "F", "T"}
+	# Count each distinct token once; Counter keeps the exact strings and
+	# iterates in first-appearance (row-major) order
+	raw_counts = Counter(itertools.chain.from_iterable(grid))
 
 	# Validate tokens and collect teleport counts
-	teleport_counts: Dict[str, int] = {}
-	start_count = 0
-	flag_count = 0
-
-	for r in range(rows):
-		for c in range(cols):
-			cell = str(grid[r][c]).strip()
-			if not cell:
-				return False, f"Empty cell at ({r},{c})"
-			head = cell[0]
-			if head not in allowed_prefixes:
-				return False, f"Invalid token '{cell}' at ({r},{c})"
-			if cell == "S":
-				start_count += 1
-			elif cell == "F":
-				flag_count += 1
-			elif head == "T":
-				teleport_counts[cell] = teleport_counts.get(cell, 0) + 1
-			elif cell not in {"0", "1"}:  # ensure only 0 or 1 are other bare tokens
-				return False, f"Invalid token '{cell}' at ({r},{c})"
+	token_counts: Dict[str, int] = {}
+	for raw, count in raw_counts.items():
+		cell = str(raw).strip()
+		if cell in {"0", "1", "S", "F"} or cell.startswith("T"):
+			token_counts[cell] = token_counts.get(cell, 0) + count
+			continue
+		# Only locate the offending cell (first in row-major order) on failure
+		for r, row in enumerate(grid):
+			if raw in row:
+				c = row.index(raw)
+				break
+		if not cell:
+			return False, f"Empty cell at ({r},{c})"
+		return False, f"Invalid token '{cell}' at ({r},{c})"
+
+	start_count = token_counts.get("S", 0)
+	flag_count = token_counts.get("F", 0)
+	teleport_counts = {t: count for t, count in token_counts.items() if t.startswith("T")}
 
 	if start_count != 1:
 		return False, "There must be exactly one start 'S'"
@@ -89,9 +104,17 @@ def _validate_grid(grid: Grid) -> Tuple[bool, str]:
 	return True, "OK"
 
 
+def _grid_key(grid: Grid) -> bytes:
+	return hashlib.blake2b(orjson.dumps(grid)).digest()
+
+
+# Solutions for the curated tracks, keyed by grid digest and filled at server startup
+_precomputed: Dict[bytes, Tuple[str, ...]] = {}
+
+
 def _load_tracks_from_json(path: str) -> List[Track]:
-	with open(path, "r") as f:
-		data = json.load(f)
+	with open(path, "rb") as f:
+		data = orjson.loads(f.read())
 	items = data.get("tracks", [])
 	tracks: List[Track] = []
 	for item in items:
@@ -107,6 +130,34 @@ def _load_tracks_from_json(path: str) -> List[Track]:
 	return tracks
 
 
+def _precompute_tracks(tracks: List[Track]) -> None:
+	from .algo import solve_grid_to_moves
+	for track in tracks:
+		# Curated grids never change, so their solutions can be served by lookup
+		try:
+			_precomputed[_grid_key(track.grid)] = tuple(solve_grid_to_moves(track.grid))
+		except ValueError as e:
+			raise RuntimeError(f"Unsolvable track '{track.id}': {e}")
+
+
+# Solved move lists keyed by grid digest, least recently used first
+_SOLVE_CACHE_SIZE = 256
+_solve_cache: "OrderedDict[bytes, Tuple[str, ...]]" = OrderedDict()
+
+
+def _solve_cached(grid: Grid, key: bytes) -> Tuple[str, ...]:
+	from .algo import solve_grid_to_moves
+	moves = _solve_cache.get(key)
+	if moves is not None:
+		_solve_cache.move_to_end(key)
+		return moves
+	moves = tuple(solve_grid_to_moves(grid))
+	_solve_cache[key] = moves
+	if len(_solve_cache) > _SOLVE_CACHE_SIZE:
+		_solve_cache.popitem(last=False)
+	return moves
+
+
 # Load and validate tracks from JSON at startup
 _tracks_json_path = os.path.join(os.path.dirname(__file__), "tracks.json")
 _validated: List[Track] = _load_tracks_from_json(_tracks_json_path)
@@ -129,13 +180,16 @@ async def validate_track(req: ValidateRequest) -> ValidateResponse:
 
 @app.post("/api/solve", response_model=SolveResponse)
 async def solve_track(req: SolveRequest) -> SolveResponse:
-	from .algo import solve_grid_to_moves
+	key = _grid_key(req.grid)
+	moves = _precomputed.get(key)
+	if moves is not None:
+		return SolveResponse(moves=list(moves))
 	ok, msg = _validate_grid(req.grid)
 	if not ok:
 		raise HTTPException(status_code=400, detail=msg)
 	try:
-		moves = solve_grid_to_moves(req.grid)
-		return SolveResponse(moves=moves)
+		moves = _solve_cached(req.grid, key)
+		return SolveResponse(moves=list(moves))
 	except ValueError as e:
 		raise HTTPException(status_code=400, detail=str(e))
 
@@ -0,0 +1,111 @@
+import os
+from typing import List, Set, Tuple
+
+import orjson
+import pytest
+
+from app.algo import _MOVE_LABELS, Grid, _find_key_points, _grid_to_array, _leg_moves, _pairwise_shortest_paths, solve_grid_to_moves
+
+Position = Tuple[int, int]
+
+STEPS = {"up": (-1, 0), "down": (1, 0), "left": (0, -1), "right": (0, 1)}
+
+
+def _replay(grid: Grid, start: Position, moves: List[str]) -> Tuple[Position, Set[Position]]:
+	# Drive the moves cell by cell, landing on the partner pad after every teleport
+	pads = {}
+	for r, row in enumerate(grid):
+		for c, cell in enumerate(row):
+			if cell.startswith("T"):
+				pads.setdefault(cell, []).append((r, c))
+	partner = {}
+	for a, b in pads.values():
+		partner[a] = b
+		partner[b] = a
+
+	pos = start
+	visited = {pos}
+	for mv in moves:
+		dr, dc = STEPS[mv]
+		r, c = pos[0] + dr, pos[1] + dc
+		assert 0 <= r < len(grid) and 0 <= c < len(grid[0]), f"{mv} leaves the grid at {pos}"
+		assert grid[r][c] != "0", f"{mv} drives into a wall at {(r, c)}"
+		pos = partner.get((r, c), (r, c))
+		visited.add(pos)
+	return pos, visited
+
+
+def _cells(grid: Grid, token: str) -> List[Position]:
+	return [(r, c) for r, row in enumerate(grid) for c, cell in enumerate(row) if cell == token]
+
+
+def _assert_visits_all_flags(grid: Grid, moves: List[str]) -> None:
+	_, visited = _replay(grid, _cells(grid, "S")[0], moves)
+	assert set(_cells(grid, "F")) <= visited
+
+
+# Two rooms joined only by a teleport. The best tour takes the adjacent flag
+# first and then turns back through the teleport to the far flag, i.e. a leg from
+# key point 2 to key point 1 that is replayed from the 1 -> 2 search. The bend
+# makes the replay fail unless moves are both reversed and flipped.
+REVERSE_TELEPORT = [
+	["F", "1", "T1", "0", "T1", "0", "0"],
+	["0", "0", "0", "0", "1", "F", "S"],
+]
+REVERSE_TELEPORT_T = [list(col) for col in zip(*REVERSE_TELEPORT)]
+
+
+@pytest.mark.parametrize("grid", [REVERSE_TELEPORT, REVERSE_TELEPORT_T])
+def test_reversed_leg_crosses_teleport(grid: Grid) -> None:
+	arr, partner_flat = _grid_to_array(grid)
+	points = _find_key_points(arr)
+	dist, parent, parent_mv = _pairwise_shortest_paths(arr, points, partner_flat)
+	cols = arr.shape[1]
+
+	moves = [_MOVE_LABELS[mv] for mv in _leg_moves(parent, parent_mv, points, 2, 1)]
+	end, _ = _replay(grid, divmod(int(points[2]), cols), moves)
+	assert end == divmod(int(points[1]), cols)
+	assert len(moves) == dist[2, 1] == 4
+
+
+@pytest.mark.parametrize("grid", [REVERSE_TELEPORT, REVERSE_TELEPORT_T])
+def test_solve_through_reversed_teleport(grid: Grid) -> None:
+	moves = solve_grid_to_moves(grid)
+	assert len(moves) == 5
+	_assert_visits_all_flags(grid, moves)
+
+
+def _curated_tracks() -> List[dict]:
+	path = os.path.join(os.path.dirname(__file__), "..", "app", "tracks.json")
+	with open(path, "rb") as f:
+		return orjson.loads(f.read())["tracks"]
+
+
+@pytest.mark.parametrize("track", _curated_tracks(), ids=lambda t: t["id"])
+def test_curated_tracks_visit_every_flag(track: dict) -> None:
+	_assert_visits_all_flags(track["grid"], solve_grid_to_moves(track["grid"]))
+
+
+def test_many_teleport_pairs() -> None:
+	# More pairs than an int8 label could hold; only the pad sign is encoded
+	rows, cols = 30, 40
+	grid = [["1"] * cols for _ in range(rows)]
+	grid[0][0] = "S"
+	grid[rows - 1][cols - 1] = "F"
+	pads = [(r, c) for r in range(2, rows - 1, 2) for c in range(0, cols, 2)][:260]
+	for i, (r, c) in enumerate(pads):
+		grid[r][c] = f"T{i // 2}"
+	_assert_visits_all_flags(grid, solve_grid_to_moves(grid))
+
+
+def test_nul_suffixed_tokens_keep_their_meaning() -> None:
+	# Trailing NULs are part of the token: "S\x00" is plain road and "T1\x00"
+	# pairs only with itself, never with "T1"
+	arr, partner_flat = _grid_to_array([["S", "S\x00", "T1", "T1\x00", "T1", "T1\x00", "F"]])
+	assert arr.tolist() == [[2, 1, -1, -1, -1, -1, 3]]
+	assert partner_flat.tolist() == [-1, -1, 4, 5, 2, 3, -1]
+
+
+def test_unreachable_flag_raises() -> None:
+	with pytest.raises(ValueError):
+		solve_grid_to_moves([["S", "0", "F"]])
@@ -0,0 +1,134 @@
+from collections import OrderedDict
+from typing import Iterator, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Import main before algo so its Numba threading-layer default takes effect
+from app import main
+from app import algo
+from app.main import Grid, _validate_grid
+
+
+@pytest.mark.parametrize(
+	"grid, message",
+	[
+		([], "Grid must be non-empty"),
+		([[]], "Grid must be non-empty"),
+		([["S", "F"], ["1"]], "All rows must have equal length"),
+		# Trailing NULs are part of the token, not padding
+		([["S\x00", "1", "F"]], "Invalid token 'S\x00' at (0,0)"),
+		([["S", "1\x00", "F"]], "Invalid token '1\x00' at (0,1)"),
+		([["S", "F", ""]], "Empty cell at (0,2)"),
+		([["S", " ", "F"]], "Empty cell at (0,1)"),
+		# The first bad cell in row-major order wins, not the first token in sort order
+		([["S", "Y", "F"], ["X", "1", "1"]], "Invalid token 'Y' at (0,1)"),
+		([["S", "1", "F"], ["1", "01", ""]], "Invalid token '01' at (1,1)"),
+		([["S", "S", "F"]], "There must be exactly one start 'S'"),
+		([["S", "1", "1"]], "There must be at least one flag 'F'"),
+		# Teleport errors follow first appearance, not label order
+		([["S", "T9", "F"], ["T1", "1", "1"]], "Teleport T9 must appear exactly twice (found 1)"),
+		([["S", "T2", "F"], ["T2", "T2", "T1"]], "Teleport T2 must appear exactly twice (found 3)"),
+	],
+)
+def test_validate_grid_rejects(grid: Grid, message: str) -> None:
+	assert _validate_grid(grid) == (False, message)
+
+
+@pytest.mark.parametrize(
+	"grid",
+	[
+		[["S", "1", "F"]],
+		# Tokens are stripped before they are counted
+		[["S", "1", "F"], ["T1 ", " T1", "1"]],
+		[[" S ", "1", "F"]],
+	],
+)
+def test_validate_grid_accepts(grid: Grid) -> None:
+	assert _validate_grid(grid) == (True, "OK")
+
+
+@pytest.fixture
+def client() -> Iterator[TestClient]:
+	# Entering the client runs the app's lifespan hook
+	with TestClient(main.app) as client:
+		yield client
+
+
+@pytest.fixture
+def solver_calls(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> List[Grid]:
+	# Record every grid that reaches the solver once startup is done, starting
+	# from an empty LRU cache
+	calls: List[Grid] = []
+	solve = algo.solve_grid_to_moves
+
+	def counting_solve(grid: Grid) -> List[str]:
+		calls.append(grid)
+		return solve(grid)
+
+	monkeypatch.setattr(algo, "solve_grid_to_moves", counting_solve)
+	monkeypatch.setattr(main, "_solve_cache", OrderedDict())
+	return calls
+
+
+def _corridor(length: int) -> Grid:
+	return [["S"] + ["1"] * length + ["F"]]
+
+
+def test_solve_reuses_cached_moves(client: TestClient, solver_calls: List[Grid]) -> None:
+	for _ in range(2):
+		resp = client.post("/api/solve", json={"grid": _corridor(3)})
+		assert resp.status_code == 200
+		assert resp.json() == {"moves": ["right"] * 4}
+	assert len(solver_calls) == 1
+
+
+def test_solve_cache_evicts_least_recently_used(client: TestClient, solver_calls: List[Grid], monkeypatch: pytest.MonkeyPatch) -> None:
+	monkeypatch.setattr(main, "_SOLVE_CACHE_SIZE", 2)
+	for length in (1, 2, 1, 3):
+		client.post("/api/solve", json={"grid": _corridor(length)})
+	# Re-using length 1 kept it fresh, so length 2 was evicted by length 3
+	assert len(solver_calls) == 3
+	client.post("/api/solve", json={"grid": _corridor(1)})
+	assert len(solver_calls) == 3
+	client.post("/api/solve", json={"grid": _corridor(2)})
+	assert len(solver_calls) == 4
+
+
+def test_solve_rejects_bad_grids(client: TestClient, solver_calls: List[Grid]) -> None:
+	resp = client.post("/api/solve", json={"grid": [["S", "X", "F"]]})
+	assert resp.status_code == 400
+	assert resp.json() == {"detail": "Invalid token 'X' at (0,1)"}
+	resp = client.post("/api/solve", json={"grid": [["S", "0", "F"]]})
+	assert resp.status_code == 400
+	assert resp.json() == {"detail": "Some flags are unreachable from start"}
+	# Failed solves are not cached
+	client.post("/api/solve", json={"grid": [["S", "0", "F"]]})
+	assert len(solver_calls) == 2
+
+
+def test_startup_precomputes_curated_tracks(monkeypatch: pytest.MonkeyPatch) -> None:
+	monkeypatch.setattr(main, "_precomputed", {})
+	with TestClient(main.app):
+		assert len(main._precomputed) == len(main._validated)
+
+
+def test_curated_track_is_served_before_validation(client: TestClient, solver_calls: List[Grid], monkeypatch: pytest.MonkeyPatch) -> None:
+	def fail_validation(grid: Grid) -> None:
+		raise AssertionError("curated grids should skip validation")
+
+	monkeypatch.setattr(main, "_validate_grid", fail_validation)
+	track = main._validated[0]
+	resp = client.post("/api/solve", json={"grid": track.grid})
+	assert resp.status_code == 200
+	assert resp.json() == {"moves": list(main._precomputed[main._grid_key(track.grid)])}
+	assert solver_calls == []
+
+
+def test_startup_fails_on_unsolvable_track(monkeypatch: pytest.MonkeyPatch) -> None:
+	unsolvable = main.Track(id="walled-off", name="Walled Off", grid=[["S", "0", "F"]])
+	monkeypatch.setattr(main, "_validated", [unsolvable])
+	monkeypatch.setattr(main, "_precomputed", {})
+	with pytest.raises(RuntimeError, match="Unsolvable track 'walled-off'"):
+		with TestClient(main.app):
+			pass